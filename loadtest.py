@@ -0,0 +1,460 @@
+"""
+Welt VX Load Test (Capacity Planning)
+
+Drives N simulated editor sessions through welt.py in one process, the same way
+a single `streamlit run welt.py` server hosts them: shared working-directory files
+(subtitles.srt), shared weltengine caches/pools, blocking engine calls in each
+script thread. Cross-session collisions on shared files are detected and reported.
+
+The Gemini backend is stubbed at the network boundary (genai.Client), so the real
+weltengine logic runs but every upload / processing wait / model call just sleeps
+for a configurable latency. No API key or quota is used.
+
+Usage:
+    python loadtest.py --sessions 1,2,4,8,16 --latency-scale 0.1
+    python loadtest.py --sessions 8 --chats 5 --json report.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import re
+import random
+import argparse
+import tempfile
+import threading
+from types import SimpleNamespace
+
+try:
+    import psutil
+except ImportError:   # Optional: falls back to os.times() / resource
+    psutil = None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "welt.py")
+
+ACTIONS = ["upload", "prefetch", "subtitles", "chapters", "assistant"]
+
+REPORT_NOTE = (
+    "Note: 'upload' times only the script rerun that stores the file. The Gemini upload +\n"
+    "processing wait is timed as 'prefetch' (background, from upload start to job done);\n"
+    "with --no-prefetch, or when a click beats the prefetch, it lands in 'subtitles'."
+)
+
+# Seconds at --latency-scale 1.0 (roughly what a short clip costs against the real API)
+DEFAULT_LATENCIES = {
+    "upload": 3.0,       # files.upload
+    "processing": 6.0,   # time until the file reports ACTIVE (polled every 2s by weltengine)
+    "subtitles": 12.0,   # generate_content for subtitles
+    "chapters": 6.0,     # generate_content for Smart Chapters
+    "assistant": 4.0,    # generate_content for VX Assistant
+}
+
+QUESTIONS = [
+    "Summarize the video",
+    "What color is the car?",
+    "Jump to timestamp: the part where they meet",
+    "Scan the video specifically for: Weapons. Provide timestamps if found.",
+    "How many people are in the first scene?",
+    "What language is spoken?",
+]
+
+# {file} tags the subtitles with the Gemini file they were generated from (collision check)
+STUB_SRT = "1\n00:00:01,000 --> 00:00:03,000\nHello from the load test ({file}).\n\n2\n00:00:04,000 --> 00:00:06,000\n(German) <i>Guten Tag.</i>\n"
+STUB_CHAPTERS = "00:00 - Opening\n00:42 - The Meeting\n01:30 - Finale"
+
+
+# --- STUBBED GEMINI BACKEND ---
+class StubBackend:
+    """
+    Stands in for genai.Client. Sleeps instead of calling Google.
+    """
+    def __init__(self, latencies, jitter):
+        self.latencies = latencies
+        self.jitter = jitter
+        self._ready_at = {}
+        self._lock = threading.Lock()
+        self.srt_collisions = 0   # Assistant calls that were sent another session's subtitles
+
+    def _sleep(self, kind):
+        mean = self.latencies[kind]
+        time.sleep(max(0.0, random.gauss(mean, mean * self.jitter)))
+
+    def client_factory(self):
+        backend = self
+
+        class _Files:
+            def upload(self, file):
+                backend._sleep("upload")
+                name = f"files/stub-{uuid.uuid4().hex[:12]}"
+                with backend._lock:
+                    backend._ready_at[name] = time.time() + backend.latencies["processing"]
+                return self.get(name)
+
+            def get(self, name):
+                with backend._lock:
+                    ready_at = backend._ready_at.get(name)
+                if ready_at is None:
+                    raise Exception(f"404 File {name} not found")
+                state = "ACTIVE" if time.time() >= ready_at else "PROCESSING"
+                return SimpleNamespace(name=name, state=SimpleNamespace(name=state))
+
+        class _Models:
+            def generate_content(self, model, contents, config=None):
+                prompt = str(contents[-1])
+                if "Generate Subtitles" in prompt:
+                    backend._sleep("subtitles")
+                    text = STUB_SRT.format(file=contents[0].name)
+                elif "Smart Chapters" in prompt:
+                    backend._sleep("chapters")
+                    text = STUB_CHAPTERS
+                else:
+                    # welt.py keeps subtitles.srt in the shared working directory
+                    seen = set(re.findall(r"files/stub-[0-9a-f]{12}", prompt))
+                    if seen - {contents[0].name}:
+                        with backend._lock:
+                            backend.srt_collisions += 1
+                    backend._sleep("assistant")
+                    text = "ANSWER: Stubbed answer from the load test backend."
+                part = SimpleNamespace(text=text)
+                candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]), finish_reason=None)
+                return SimpleNamespace(candidates=[candidate], text=text)
+
+        class _Client:
+            def __init__(self, api_key=None, **kwargs):
+                self.files = _Files()
+                self.models = _Models()
+
+        return _Client
+
+
+# --- RESOURCE SAMPLER ---
+class ResourceSampler(threading.Thread):
+    """
+    Samples server (this process) RSS and CPU% at a fixed interval.
+    """
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+        self._t0 = time.time()
+        self._proc = psutil.Process() if psutil is not None else None
+
+    def _read(self):
+        if self._proc is not None:
+            return self._proc.memory_info().rss / 2**20, self._proc.cpu_percent(interval=None)
+        import resource
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # Peak, not current
+        t = os.times()
+        cpu = t.user + t.system
+        prev = getattr(self, "_prev_cpu", None)
+        self._prev_cpu = (cpu, time.time())
+        pct = 0.0 if prev is None else 100.0 * (cpu - prev[0]) / max(time.time() - prev[1], 1e-6)
+        return rss_kb / 1024, pct
+
+    def run(self):
+        self._read()   # Primes cpu_percent
+        while not self._stop_event.wait(self.interval):
+            rss, cpu = self._read()
+            self.samples.append({"t": round(time.time() - self._t0, 2), "rss_mb": round(rss, 1), "cpu_pct": round(cpu, 1)})
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# --- SIMULATED SESSION ---
+def _patch_apptest_for_threads():
+    """
+    AppTest assumes one test at a time:
+    1. It installs a mock Runtime singleton per run and clears it afterwards,
+       which breaks other sessions still mid-run. Keep the last one visible instead.
+    2. Compiling the script (ast.parse) from several threads at once can crash
+       CPython 3.11, so compilation is serialized (script execution is not).
+    3. Each run patches the global "global.appTest" option on and restores the
+       previous value on exit, so overlapping runs could switch it off for each
+       other (widget test data then goes missing). Turn it on for the whole process.
+    """
+    from streamlit import config
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner import magic
+
+    config.set_option("global.appTest", True)
+
+    compile_lock = threading.Lock()
+    add_magic = magic.add_magic
+
+    def locked_add_magic(code, script_path):
+        with compile_lock:
+            return add_magic(code, script_path)
+
+    magic.add_magic = locked_add_magic
+
+    last = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" in last:
+            return last["runtime"]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in last
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def _find_button(at, text):
+    for button in at.button:
+        if text in button.label:
+            return button
+    raise LookupError(f"Button not found: {text}")
+
+
+class SimulatedSession(threading.Thread):
+    """
+    One editor: upload -> subtitles -> chapters -> N assistant chats.
+    """
+    def __init__(self, session_id, args, results, start_delay):
+        super().__init__(daemon=True, name=f"session-{session_id}")
+        self.session_id = session_id
+        self.args = args
+        self.results = results
+        self.start_delay = start_delay
+        self.video_path = None
+
+    def _record(self, action, t0, error=None):
+        self.results.append({
+            "session": self.session_id,
+            "action": action,
+            "seconds": time.perf_counter() - t0,
+            "end": time.time(),
+            "error": error,
+        })
+
+    def _timed(self, action, fn):
+        t0 = time.perf_counter()
+        error = None
+        try:
+            fn()
+            if self.at.exception:
+                error = self.at.exception[0].message
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self._record(action, t0, error)
+        return error is None
+
+    def _watch_prefetch(self, t0):
+        """
+        Records the background prefetch once it finishes, without blocking the session.
+        """
+        job = self.at.session_state.prefetch_job
+        if job is None:
+            self._record("prefetch", t0, "Prefetch rejected by admission limit")
+            return
+
+        def done(future):
+            self._record("prefetch", t0, "Prefetch cancelled" if future.cancelled() else None)
+        job.future.add_done_callback(done)
+
+    def _think(self):
+        if self.args.think_time:
+            time.sleep(random.uniform(0.5, 1.5) * self.args.think_time)
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+
+        time.sleep(self.start_delay)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=self.args.timeout)
+        if self.args.no_prefetch:
+            self.at.session_state["prefetch_settings"] = {"enabled": False, "chapters": False}
+        self.at.run()
+
+        # Unique bytes per session: welt.py stores each upload in its own content-addressed
+        # file, so the upload / shot / answer caches only hit within a session. Other shared
+        # state (subtitles.srt) is not isolated; collisions are counted and reported.
+        payload = uuid.uuid4().bytes * (self.args.video_kb * 64)
+        name = f"loadtest_{self.session_id}.mp4"
+        t_upload = time.perf_counter()
+        if not self._timed("upload", lambda: self.at.file_uploader[0].set_value((name, payload, "video/mp4")).run()):
+            return
+        self.video_path = self.at.session_state.active_video_path
+        if not self.args.no_prefetch:
+            self._watch_prefetch(t_upload)
+        self._think()
+
+        def subtitles():
+            # Dialog widgets only exist on the run that opens the dialog, so the
+            # opening click and the Generate click go in together (as one browser rerun would)
+            _find_button(self.at, "Subtitles").click().run()
+            _find_button(self.at, "Subtitles").click()
+            _find_button(self.at, "Generate Subtitles").click().run()
+        self._timed("subtitles", subtitles)
+        self._think()
+
+        self._timed("chapters", lambda: _find_button(self.at, "Smart Chapters").click().run())
+        self._think()
+
+        _find_button(self.at, "VX Assistant").click().run()
+        for _ in range(self.args.chats):
+            question = random.choice(QUESTIONS[:self.args.question_pool])
+            self._timed("assistant", lambda: self.at.chat_input[0].set_value(question).run())
+            self._think()
+
+
+# --- REPORTING ---
+def percentile(values, pct):
+    """
+    Nearest-rank percentile.
+    """
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_level(n_sessions, results, samples, wall, collisions):
+    ok = [r for r in results if r["error"] is None]
+    actions = {}
+    for action in ACTIONS:
+        times = [r["seconds"] for r in ok if r["action"] == action]
+        actions[action] = {
+            "count": len(times),
+            "errors": sum(1 for r in results if r["action"] == action and r["error"]),
+            "p50": percentile(times, 50),
+            "p95": percentile(times, 95),
+            "p99": percentile(times, 99),
+        }
+    return {
+        "sessions": n_sessions,
+        "wall_seconds": wall,
+        "throughput": len(ok) / wall if wall else 0.0,   # completed actions / second
+        "actions": actions,
+        "peak_rss_mb": max((s["rss_mb"] for s in samples), default=float("nan")),
+        "mean_cpu_pct": sum(s["cpu_pct"] for s in samples) / len(samples) if samples else float("nan"),
+        "resources": samples,
+        "errors": [r["error"] for r in results if r["error"]][:10],
+        "collisions": collisions,
+    }
+
+
+def find_saturation(levels, min_gain):
+    """
+    First session count whose extra load no longer buys min_gain more throughput.
+    """
+    for prev, cur in zip(levels, levels[1:]):
+        if cur["throughput"] < prev["throughput"] * (1 + min_gain):
+            return prev["sessions"]
+    return None
+
+
+def print_level(level):
+    print(f"\n=== {level['sessions']} session(s): {level['wall_seconds']:.1f}s wall, "
+          f"{level['throughput']:.2f} actions/s, peak RSS {level['peak_rss_mb']:.0f} MB, "
+          f"mean CPU {level['mean_cpu_pct']:.0f}% ===")
+    print(f"{'action':<12}{'count':>7}{'errors':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}")
+    for action, stats in level["actions"].items():
+        print(f"{action:<12}{stats['count']:>7}{stats['errors']:>8}"
+              f"{stats['p50']:>9.2f}{stats['p95']:>9.2f}{stats['p99']:>9.2f}")
+    for error in level["errors"]:
+        print(f"  ⚠️ {error}")
+    c = level["collisions"]
+    if c["shared_video_paths"] or c["srt_collisions"]:
+        print(f"  ⚠️ Shared state between sessions: {c['shared_video_paths']} session(s) on another session's video file, "
+              f"{c['srt_collisions']} assistant call(s) sent another session's subtitles.srt. "
+              f"Sessions were not isolated at this level.")
+
+
+# --- MAIN ---
+def run_level(n_sessions, args, backend):
+    results = []
+    with backend._lock:
+        backend.srt_collisions = 0
+    sampler = ResourceSampler(args.sample_interval)
+    sampler.start()
+    sessions = [
+        SimulatedSession(i, args, results, start_delay=args.ramp * i / max(n_sessions, 1))
+        for i in range(n_sessions)
+    ]
+    t0 = time.time()
+    for s in sessions:
+        s.start()
+    for s in sessions:
+        s.join()
+    wall = time.time() - t0
+    sampler.stop()
+
+    paths = [s.video_path for s in sessions if s.video_path]
+    collisions = {
+        "shared_video_paths": len(paths) - len(set(paths)),
+        "srt_collisions": backend.srt_collisions,
+    }
+    return summarize_level(n_sessions, results, sampler.samples, wall, collisions)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for welt.py (stubbed Gemini backend).")
+    parser.add_argument("--sessions", default="1,2,4,8", help="Comma-separated session counts to step through")
+    parser.add_argument("--chats", type=int, default=3, help="Assistant messages per session")
+    parser.add_argument("--question-pool", type=int, default=len(QUESTIONS), help="Distinct questions to draw from (lower = more cache hits)")
+    parser.add_argument("--video-kb", type=int, default=1024, help="Size of each simulated upload")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between actions (s)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Spread session starts over this many seconds")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply all backend latencies")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency std-dev as a fraction of the mean")
+    for kind, seconds in DEFAULT_LATENCIES.items():
+        parser.add_argument(f"--{kind}-latency", type=float, default=seconds, help=f"Stub {kind} latency (s)")
+    parser.add_argument("--no-prefetch", action="store_true", help="Disable the on-select prefetch stage")
+    parser.add_argument("--timeout", type=float, default=900, help="Per script-run timeout (s)")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Resource sampling period (s)")
+    parser.add_argument("--min-gain", type=float, default=0.10, help="Throughput gain below which a level counts as saturated")
+    parser.add_argument("--json", help="Write the full report (incl. resource timelines) to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    latencies = {k: getattr(args, f"{k}_latency") * args.latency_scale for k in DEFAULT_LATENCIES}
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    # welt.py needs a key to get past its guard; the stub never uses it
+    os.environ.setdefault("GEMINI_API_KEY", "loadtest-stub")
+    sys.path.insert(0, APP_DIR)
+    _patch_apptest_for_threads()
+    import weltengine
+    backend = StubBackend(latencies, args.jitter)
+    weltengine.genai.Client = backend.client_factory()
+
+    # Keep subtitles.srt / .welt_cache out of the repo
+    workdir = tempfile.mkdtemp(prefix="welt_loadtest_")
+    os.chdir(workdir)
+    print(f"🧪 Load test in {workdir} | latencies: {latencies}")
+    print(REPORT_NOTE)
+
+    report = []
+    for n in levels:
+        level = run_level(n, args, backend)
+        print_level(level)
+        report.append(level)
+
+    saturation = find_saturation(report, args.min_gain)
+    if saturation is None:
+        print(f"\n📈 Throughput still scaling at {levels[-1]} sessions; try higher counts.")
+    else:
+        print(f"\n📉 Throughput saturates at ~{saturation} concurrent session(s).")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"latencies": latencies, "saturation_sessions": saturation, "levels": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
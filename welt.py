@@ -115,6 +115,9 @@ if "form_reset_id" not in st.session_state: st.session_state.form_reset_id = 0
 if "input_mode" not in st.session_state: st.session_state.input_mode = "normal" 
 if "safety_settings" not in st.session_state:
     st.session_state.safety_settings = {"nsfw": False, "gore": False, "profanity": False}
+if "prefetch_settings" not in st.session_state:
+    st.session_state.prefetch_settings = {"enabled": True, "chapters": False}
+if "prefetch_job" not in st.session_state: st.session_state.prefetch_job = None
 
 # --- MODAL 1: SUBTITLE STUDIO ---
 @st.dialog("Subtitle Generator")
@@ -158,6 +161,10 @@ def open_advanced_options():
         current_gore = st.checkbox("Allow Gore/Violence", value=st.session_state.safety_settings["gore"])
         current_prof = st.checkbox("Allow Profanity", value=st.session_state.safety_settings["profanity"])
         
+        st.caption("Performance")
+        current_prefetch = st.checkbox("Prefetch on video select", value=st.session_state.prefetch_settings["enabled"], help="Upload and prepare the video in the background as soon as it is selected")
+        current_prefetch_chap = st.checkbox("Also pre-generate Smart Chapters", value=st.session_state.prefetch_settings["chapters"], help="Uses one model call per selected video")
+        
         st.info("Changes will only apply when you click Save.")
         
         st.markdown(
@@ -170,6 +177,8 @@ def open_advanced_options():
             st.session_state.safety_settings["nsfw"] = current_nsfw
             st.session_state.safety_settings["gore"] = current_gore
             st.session_state.safety_settings["profanity"] = current_prof
+            st.session_state.prefetch_settings["enabled"] = current_prefetch
+            st.session_state.prefetch_settings["chapters"] = current_prefetch_chap
             st.rerun()
 
 # --- MAIN APP LOGIC ---
@@ -178,7 +187,6 @@ st.caption(f"Redefine Viewer Experience with Multimodal AI Agents (Powered by Ge
 st.subheader("Studio")
 
 MASTER_DEMO_PATH = "master_demo.webm" 
-WORKING_VIDEO_PATH = "temp_video.mp4" 
 
 uploaded_file = st.file_uploader("Upload Video", type=["mp4", "mov", "avi", "webm"],help="Streamlit Upload limit: 200MB. For higher upload limits (500MB) please run on local device", label_visibility="collapsed")
 use_demo = False
@@ -190,14 +198,27 @@ current_video_id = ""
 
 if uploaded_file:
     start_processing = True
-    with open(WORKING_VIDEO_PATH, "wb") as f: f.write(uploaded_file.getbuffer())
-    st.session_state.active_video_path = WORKING_VIDEO_PATH
     current_video_id = uploaded_file.name
 elif use_demo:
     start_processing = True
-    st.session_state.active_video_path = MASTER_DEMO_PATH
     current_video_id = "Demo_Video_Master"
 
+# Switching videos: stop the previous background job before touching any files
+if start_processing and current_video_id != st.session_state.last_video_id:
+    if st.session_state.prefetch_job is not None:
+        st.session_state.prefetch_job.cancel()
+    st.session_state.prefetch_job = None
+
+if uploaded_file:
+    # Each upload gets its own content-addressed file (never shared or rewritten)
+    upload_key = (uploaded_file.file_id, uploaded_file.size)
+    if st.session_state.get("upload_key") != upload_key or not os.path.exists(st.session_state.get("upload_path", "")):
+        st.session_state.upload_path = weltengine.save_upload(uploaded_file.getbuffer(), uploaded_file.name)
+        st.session_state.upload_key = upload_key
+    st.session_state.active_video_path = st.session_state.upload_path
+elif use_demo:
+    st.session_state.active_video_path = MASTER_DEMO_PATH
+
 if start_processing and current_video_id != st.session_state.last_video_id:
     if os.path.exists("subtitles.srt"): os.remove("subtitles.srt")
     st.session_state.messages = []
@@ -205,6 +226,14 @@ if start_processing and current_video_id != st.session_state.last_video_id:
     st.session_state.video_start_time = 0
     st.session_state.last_video_id = current_video_id
     st.session_state.input_mode = "normal" 
+    
+    # Speculative groundwork: upload + processing wait start now, not on first click
+    if st.session_state.prefetch_settings["enabled"]:
+        st.session_state.prefetch_job = weltengine.start_prefetch(
+            api_key, 
+            st.session_state.active_video_path, 
+            with_chapters=st.session_state.prefetch_settings["chapters"]
+        )
     st.rerun()
 
 # --- LAYOUT ---
@@ -248,22 +277,13 @@ if "active_video_path" in st.session_state:
         if st.session_state.chapters:
             st.markdown("#### :material/menu_book: Chapters") 
             with st.container(height=200):
-                for ts, title in st.session_state.chapters:
-                    if st.button(f"{ts} - {title}", key=ts, use_container_width=True):
-                        try:
-                            # Safely clean the string and convert only valid numeric parts
-                            parts = [int(p.strip()) for p in ts.split(":") if p.strip().isdigit()]
-                            
-                            if len(parts) == 3: # HH:MM:SS
-                                sec = parts[0]*3600 + parts[1]*60 + parts[2]
-                            elif len(parts) == 2: # MM:SS
-                                sec = parts[0]*60 + parts[1]
-                            else:
-                                sec = 0
-                            
+                for i, (ts, title) in enumerate(st.session_state.chapters):
+                    if st.button(f"{ts} - {title}", key=f"chap_{i}", use_container_width=True):
+                        sec = weltengine.parse_timestamp(ts)
+                        if sec is not None:
                             st.session_state.video_start_time = sec
                             st.rerun()
-                        except (ValueError, IndexError):
+                        else:
                             st.toast(f"⚠️ Formatting error in timestamp: {ts}", icon="⚠️")
 
     # --- RIGHT COLUMN (VX Assistant) ---
@@ -379,10 +399,10 @@ if "active_video_path" in st.session_state:
                                     ts = parts[0].strip().replace("[", "").replace("]", "")
                                     desc = parts[1] if len(parts) > 1 else "Jumping..."
                                     
-                                    t_parts = ts.split(":")
-                                    if len(t_parts) == 3: sec = int(t_parts[0])*3600 + int(t_parts[1])*60 + int(t_parts[2])
-                                    elif len(t_parts) == 2: sec = int(t_parts[0])*60 + int(t_parts[1])
-                                    else: sec = 0
+                                    sec = weltengine.parse_timestamp(ts) or 0
+                                    # Land on the real scene cut nearest to the model's guess
+                                    sec = weltengine.snap_video_timestamp(st.session_state.active_video_path, sec)
+                                    ts = weltengine.format_timestamp(sec)
                                     
                                     st.session_state.video_start_time = sec
                                     final_msg = f"🎥 **Jumped to {ts}**: {desc}"
@@ -1,4 +1,16 @@
+import os
+import json
+import math
 import time
+import bisect
+import shutil
+import hashlib
+import threading
+import subprocess
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
 import srt
 from google import genai
 from google.genai import types
@@ -7,8 +19,373 @@ from google.genai import types
 # Optimized for the Gemini 3 Hackathon
 MODEL_ID = "gemini-3-flash-preview"
 
+# --- SHOT INDEX CONFIGURATION ---
+# Frames are decoded by ffmpeg at low resolution and compared locally (no API cost).
+CACHE_DIR = ".welt_cache"
+SHOT_INDEX_VERSION = 1
+SHOT_SAMPLE_FPS = 4            # Sampled frames per second of video
+SHOT_FRAME_SIZE = (72, 40)     # Width x Height (divisible by the 9x8 hash grid)
+SHOT_CUT_THRESHOLD = 0.35      # Combined histogram + hash distance (0..1) that counts as a cut
+SHOT_MIN_GAP = 1.0             # Seconds between cuts (suppresses flashes / strobes)
+SHOT_SNAP_TOLERANCE = 3.0      # Seconds a model timestamp may move to reach a real cut
+SHOT_PROMPT_LIMIT = 40         # Max candidate cuts handed to the model
+SHOT_INDEX_CACHE_SIZE = 32     # In-memory LRU of shot indexes (disk cache is unbounded)
+FINGERPRINT_CACHE_SIZE = 64    # In-memory LRU of path -> content hash
+SHOT_WORKERS = 2               # Concurrent ffmpeg decodes per server
+
+# --- ASSISTANT CACHE CONFIGURATION ---
+ASSISTANT_CACHE_SIZE = 128     # LRU bound, shared by all sessions of this server
+_EDIT_PREFIXES = ("PATCH:", "CHAPTERS:")
+_FAILED_ANSWERS = ("ANSWER: Error", "ANSWER: I cannot answer")
+
+# --- PREFETCH CONFIGURATION ---
+# Speculative groundwork started when a video is selected (see start_prefetch).
+PREFETCH_WORKERS = 2           # Concurrent background uploads per server
+PREFETCH_MAX_PENDING = 4       # Admission limit: running + queued jobs
+UPLOAD_CACHE_SIZE = 32         # Remembered Gemini file handles (files expire server-side after 48h)
+UPLOAD_MAX_AGE_HOURS = 24      # Local upload copies unused for this long are pruned from .welt_cache
+CHAPTER_PREFETCH_SIZE = 16     # Unclaimed prefetched chapter results kept (LRU)
+
+_fingerprints = OrderedDict()   # abs path -> (size, mtime_ns, hash)
+_uploads = OrderedDict()   # video hash -> uploaded genai File
+_upload_last_used = {}   # abs path of a local upload copy -> last time any session used it
+_upload_locks = {}   # video hash -> [Lock, waiters] (one upload per video at a time)
+_chapter_prefetch = OrderedDict()   # video hash -> Future[chapters | None]
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="welt-prefetch")
+_prefetch_pending = 0
+_shot_indexes = OrderedDict()   # video hash -> [(seconds, score), ...]
+_shot_builds = {}   # video hash -> Future[cuts] of the one build in flight
+_shot_pool = ThreadPoolExecutor(max_workers=SHOT_WORKERS, thread_name_prefix="welt-shots")
+_assistant_cache = OrderedDict()   # (video hash, instruction, safety, context) -> response
+_cache_lock = threading.Lock()
+
+# --- HELPER: TIMESTAMPS ---
+def parse_timestamp(ts):
+    """
+    'HH:MM:SS' / 'MM:SS' / '[MM:SS]' -> whole seconds. Returns None if unreadable.
+    """
+    try:
+        parts = [p.strip() for p in str(ts).strip().strip("[]").split(":")]
+        if not 1 < len(parts) < 4:
+            return None
+        values = [int(p) for p in parts[:-1]] + [float(parts[-1])]
+    except ValueError:
+        return None
+    seconds = 0
+    for v in values:
+        seconds = seconds * 60 + v
+    return int(seconds)
+
+def format_timestamp(seconds):
+    """
+    Whole seconds -> 'MM:SS' (or 'HH:MM:SS' past the first hour).
+    """
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+# --- HELPER: VIDEO FINGERPRINT ---
+def video_fingerprint(video_path):
+    """
+    Content hash of the video file. Re-hashed only when size or mtime change.
+    Upload copies (see save_upload) carry their hash in the file name, so they are
+    never re-read and still resolve if the local copy has gone missing.
+    """
+    path = os.path.abspath(video_path)
+    upload_hash = _upload_copy_hash(path)
+    if upload_hash is not None:
+        with _cache_lock:
+            _upload_last_used[path] = time.time()
+        return upload_hash
+
+    stat = os.stat(path)
+    with _cache_lock:
+        cached = _fingerprints.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    video_hash = digest.hexdigest()
+    _remember_fingerprint(path, stat, video_hash)
+    return video_hash
+
+def _remember_fingerprint(path, stat, video_hash):
+    with _cache_lock:
+        _fingerprints[path] = (stat.st_size, stat.st_mtime_ns, video_hash)
+        _fingerprints.move_to_end(path)
+        while len(_fingerprints) > FINGERPRINT_CACHE_SIZE:
+            _fingerprints.popitem(last=False)
+
+# --- HELPER: UPLOAD STORAGE ---
+def _upload_copy_hash(path):
+    """
+    Content hash encoded in a save_upload file name, or None for any other path.
+    """
+    if os.path.dirname(path) != os.path.abspath(CACHE_DIR):
+        return None
+    name = os.path.basename(path)
+    if not name.startswith("upload_") or name.endswith(".part"):
+        return None
+    video_hash = os.path.splitext(name)[0][len("upload_"):]
+    return video_hash if len(video_hash) == 32 else None
+
+def save_upload(data, filename):
+    """
+    Stores an uploaded video as its own content-addressed file in .welt_cache.
+    The file is written once (atomic rename) and never rewritten, so prefetch
+    jobs and other sessions always read complete bytes matching its hash.
+    Copies are pruned only after UPLOAD_MAX_AGE_HOURS without any use.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(data)
+    video_hash = digest.hexdigest()
+    ext = os.path.splitext(filename)[1].lower() or ".mp4"
+    path = os.path.abspath(os.path.join(CACHE_DIR, f"upload_{video_hash}{ext}"))
+
+    with _cache_lock:
+        _upload_last_used[path] = time.time()
+    if not os.path.exists(path):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        _prune_uploads()
+    return path
+
+def _prune_uploads():
+    """
+    Deletes local upload copies (and stray .part files) that nobody has used for
+    UPLOAD_MAX_AGE_HOURS. Age-based, so files of live sessions/jobs are never touched.
+    """
+    cutoff = time.time() - UPLOAD_MAX_AGE_HOURS * 3600
+    try:
+        names = [n for n in os.listdir(CACHE_DIR) if n.startswith("upload_")]
+    except OSError:
+        return
+    for name in names:
+        path = os.path.abspath(os.path.join(CACHE_DIR, name))
+        with _cache_lock:
+            last_used = _upload_last_used.get(path, 0)
+        try:
+            if max(os.path.getmtime(path), last_used) < cutoff:
+                os.remove(path)
+                with _cache_lock:
+                    _upload_last_used.pop(path, None)
+        except OSError:
+            pass
+
+# --- SHOT BOUNDARY INDEX ---
+@lru_cache(maxsize=None)
+def _ffmpeg_available():
+    """
+    Checked once per process, so a missing ffmpeg costs one warning, not a spawn per call.
+    """
+    if shutil.which("ffmpeg") is None:
+        print("⚠️ DEBUG: ffmpeg not found; shot detection disabled (model-only timestamps).")
+        return False
+    return True
+
+def _decode_sample_frames(video_path, batch_size=256):
+    """
+    Streams (N, H, W, 3) uint8 batches of low-res RGB frames from ffmpeg.
+    """
+    w, h = SHOT_FRAME_SIZE
+    frame_bytes = w * h * 3
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-i", video_path, "-an", "-sn",
+        "-vf", f"fps={SHOT_SAMPLE_FPS},scale={w}:{h}",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            buf = proc.stdout.read(frame_bytes * batch_size)
+            n = len(buf) // frame_bytes
+            if n == 0:
+                break
+            yield np.frombuffer(buf, dtype=np.uint8, count=n * frame_bytes).reshape(n, h, w, 3)
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+def _frame_signatures(frames):
+    """
+    Per-frame colour histogram (16 bins x RGB) and 64-bit difference hash.
+    Fully vectorized over the batch.
+    """
+    n, h, w, _ = frames.shape
+
+    # 1. Histogram: offset each (frame, channel) into its own bin range, then one bincount.
+    bins = (frames >> 4).astype(np.int64) + np.arange(3) * 16
+    bins += (np.arange(n) * 48)[:, None, None, None]
+    hist = np.bincount(bins.ravel(), minlength=n * 48).reshape(n, 48) / float(h * w)
+
+    # 2. dHash: grayscale -> 9x8 block means -> left/right brightness gradient.
+    gray = frames @ np.array([0.299, 0.587, 0.114])
+    grid = gray.reshape(n, 8, h // 8, 9, w // 9).mean(axis=(2, 4))
+    bits = (grid[:, :, 1:] > grid[:, :, :-1]).reshape(n, 64)
+    return hist, bits
+
+def build_shot_index(video_path):
+    """
+    Local scene detection. Returns [(seconds, score), ...] for every detected cut.
+    """
+    hists, hashes = [], []
+    for frames in _decode_sample_frames(video_path):
+        hist, bits = _frame_signatures(frames)
+        hists.append(hist)
+        hashes.append(bits)
+    if not hists:
+        return []
+    hist = np.concatenate(hists)
+    bits = np.concatenate(hashes)
+    if len(hist) < 2:
+        return []
+
+    # Histogram L1 is at most 2 per channel -> divide by 6 to land in 0..1
+    hist_dist = np.abs(np.diff(hist, axis=0)).sum(axis=1) / 6.0
+    hash_dist = (bits[1:] != bits[:-1]).mean(axis=1)
+    score = 0.5 * hist_dist + 0.5 * hash_dist
+
+    cuts = []
+    for i in np.flatnonzero(score >= SHOT_CUT_THRESHOLD):
+        # Frame i+1 is the first sample of the new shot
+        t, s = float(i + 1) / SHOT_SAMPLE_FPS, float(score[i])
+        if cuts and t - cuts[-1][0] < SHOT_MIN_GAP:
+            if s > cuts[-1][1]:
+                cuts[-1] = (t, s)
+            continue
+        cuts.append((t, s))
+    print(f"🎬 DEBUG: Shot index built: {len(cuts)} cuts over {len(hist)} sampled frames.")
+    return cuts
+
+def _cached_shot_index(video_hash):
+    """
+    Shot index from memory or .welt_cache on disk, or None if never built.
+    """
+    with _cache_lock:
+        if video_hash in _shot_indexes:
+            _shot_indexes.move_to_end(video_hash)
+            return _shot_indexes[video_hash]
+
+    cache_path = os.path.join(CACHE_DIR, f"shots_{video_hash}.json")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == SHOT_INDEX_VERSION:
+            cuts = [tuple(c) for c in data["cuts"]]
+            _remember_shot_index(video_hash, cuts)
+            return cuts
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def _remember_shot_index(video_hash, cuts):
+    with _cache_lock:
+        _shot_indexes[video_hash] = cuts
+        _shot_indexes.move_to_end(video_hash)
+        while len(_shot_indexes) > SHOT_INDEX_CACHE_SIZE:
+            _shot_indexes.popitem(last=False)
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+def _start_shot_index(video_path):
+    """
+    Never blocks. Returns a Future for the video's shot index: already completed
+    when cached, otherwise the single in-flight build shared by every caller.
+    """
+    try:
+        video_hash = video_fingerprint(video_path)
+    except OSError:
+        return _completed([])
+    cuts = _cached_shot_index(video_hash)
+    if cuts is not None:
+        return _completed(cuts)
+    if not _ffmpeg_available() or not os.path.exists(video_path):
+        return _completed([])
+
+    with _cache_lock:
+        if video_hash in _shot_indexes:   # Finished between the lookup and here
+            return _completed(_shot_indexes[video_hash])
+        future = _shot_builds.get(video_hash)
+        if future is None:
+            future = _shot_pool.submit(_build_and_store_shot_index, video_hash, video_path)
+            _shot_builds[video_hash] = future
+    return future
+
+def _build_and_store_shot_index(video_hash, video_path):
+    """
+    Pool task behind _start_shot_index: build, persist to .welt_cache, remember.
+    """
+    try:
+        try:
+            cuts = build_shot_index(video_path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ DEBUG: Shot detection unavailable: {e}")
+            return []
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(os.path.join(CACHE_DIR, f"shots_{video_hash}.json"), "w", encoding="utf-8") as f:
+                json.dump({"version": SHOT_INDEX_VERSION, "cuts": cuts}, f)
+        except OSError:
+            pass
+        _remember_shot_index(video_hash, cuts)
+        return cuts
+    finally:
+        with _cache_lock:
+            _shot_builds.pop(video_hash, None)
+
+def get_shot_index(video_path):
+    """
+    Cached shot-boundary index (memory, then .welt_cache on disk, then build).
+    Returns [] if ffmpeg is unavailable so callers fall back to model-only timing.
+    Blocks until the (shared) build finishes; UI code paths should use peek_shot_index.
+    """
+    return _start_shot_index(video_path).result()
+
+def peek_shot_index(video_path):
+    """
+    Non-blocking lookup: the cached index, or [] while a background build runs.
+    """
+    future = _start_shot_index(video_path)
+    return future.result() if future.done() else []
+
+def snap_to_shot(seconds, cuts, tolerance=SHOT_SNAP_TOLERANCE):
+    """
+    Moves a timestamp onto the nearest real cut (within tolerance).
+    Rounds up so playback starts inside the new shot.
+    """
+    if not cuts or seconds is None or seconds <= 0:
+        return seconds
+    times = [t for t, _ in cuts]
+    i = bisect.bisect_left(times, seconds)
+    nearest = min(times[max(i - 1, 0):i + 1], key=lambda t: abs(t - seconds))
+    if abs(nearest - seconds) <= tolerance:
+        return int(math.ceil(nearest))
+    return seconds
+
+def snap_video_timestamp(video_path, seconds):
+    """
+    Convenience wrapper for the UI (e.g. SEEK: responses). Never decodes video in
+    the caller's thread: without a cached index the timestamp is returned as-is.
+    """
+    return snap_to_shot(seconds, peek_shot_index(video_path))
+
+class PrefetchCancelled(Exception):
+    """Raised inside a prefetch job once its session has moved on to another video."""
+
+
 # --- HELPER: ROBUST PROCESSING WAITER ---
-def _wait_for_processing(client, myfile):
+def _wait_for_processing(client, myfile, cancel_event=None):
     """
     Prevents infinite loops if Google's server hangs. 
     Waits max 5 minutes (300s) for the video to become ACTIVE.
@@ -21,10 +398,169 @@ def _wait_for_processing(client, myfile):
             return myfile
         elif myfile.state.name == "FAILED":
             raise Exception("Video processing failed on Google servers.")
+        if cancel_event is not None and cancel_event.is_set():
+            raise PrefetchCancelled(myfile.name)
         time.sleep(2)
         myfile = client.files.get(name=myfile.name)
     raise Exception("Video processing timed out (5-minute limit reached).")
 
+# --- HELPER: UPLOAD REUSE ---
+def _get_active_file(client, video_path, cancel_event=None):
+    """
+    Uploads a video once per content hash and reuses the ACTIVE file afterwards.
+    A second caller for the same video waits for the in-flight upload instead of
+    starting its own (this is how clicks pick up a running prefetch).
+    """
+    video_hash = video_fingerprint(video_path)
+    with _cache_lock:
+        entry = _upload_locks.setdefault(video_hash, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            return _get_active_file_locked(client, video_path, video_hash, cancel_event)
+    finally:
+        with _cache_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _upload_locks[video_hash]
+
+def _get_active_file_locked(client, video_path, video_hash, cancel_event):
+    """
+    Body of _get_active_file, run while holding the per-video upload lock.
+    """
+    with _cache_lock:
+        myfile = _uploads.get(video_hash)
+    if myfile is not None:
+        try:
+            myfile = client.files.get(name=myfile.name)
+            if myfile.state.name != "FAILED":
+                print(f"♻️ DEBUG: Reusing upload {myfile.name}")
+                return _wait_for_processing(client, myfile, cancel_event)
+        except PrefetchCancelled:
+            raise
+        except Exception as e:
+            print(f"⚠️ DEBUG: Cached upload unusable ({e}), uploading again.")
+
+    # The lock may have been held for minutes; don't start an upload nobody wants
+    if cancel_event is not None and cancel_event.is_set():
+        raise PrefetchCancelled(video_path)
+    if not os.path.exists(video_path):
+        raise Exception("Local copy of the video is no longer available. Please select the video again.")
+    print(f"☁️ DEBUG: Starting Upload for {video_path}...")
+    myfile = client.files.upload(file=video_path)
+    with _cache_lock:
+        # Remember it even if processing is still running, so nobody uploads twice
+        _uploads[video_hash] = myfile
+        _uploads.move_to_end(video_hash)
+        while len(_uploads) > UPLOAD_CACHE_SIZE:
+            _uploads.popitem(last=False)
+    return _wait_for_processing(client, myfile, cancel_event)
+
+# --- SPECULATIVE PREFETCH ---
+class PrefetchJob:
+    """
+    Handle for the background groundwork of one selected video (kept per session).
+    """
+    def __init__(self, video_path):
+        self.video_path = video_path
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise PrefetchCancelled(self.video_path)
+
+    @property
+    def done(self):
+        return self.future is None or self.future.done()
+
+
+def _release_prefetch_slot(_future):
+    global _prefetch_pending
+    with _cache_lock:
+        _prefetch_pending -= 1
+
+
+def start_prefetch(api_key, video_path, with_chapters=False):
+    """
+    Hashes, uploads and waits for ACTIVE in the background; also builds the shot
+    index and, optionally, Smart Chapters. Returns a PrefetchJob, or None when the
+    admission limit is reached (the UI then simply does the work on click).
+    """
+    global _prefetch_pending
+    with _cache_lock:
+        if _prefetch_pending >= PREFETCH_MAX_PENDING:
+            print("⏸️ DEBUG: Prefetch skipped (admission limit reached).")
+            return None
+        _prefetch_pending += 1
+
+    job = PrefetchJob(video_path)
+    job.future = _prefetch_pool.submit(_run_prefetch, job, api_key, with_chapters)
+    job.future.add_done_callback(_release_prefetch_slot)
+    return job
+
+
+def _resolve_chapter_prefetch(future, chapters):
+    """
+    Check-and-set under _cache_lock: LRU eviction may resolve the same future
+    from another thread at any time.
+    """
+    with _cache_lock:
+        if not future.done():
+            future.set_result(chapters)
+
+
+def _run_prefetch(job, api_key, with_chapters):
+    """
+    Worker body for start_prefetch. Every stage checks for cancellation first.
+    """
+    chapters_future = None
+    video_hash = None
+    try:
+        video_hash = video_fingerprint(job.video_path)
+        if with_chapters:
+            with _cache_lock:
+                # Another session already prefetching this video's chapters keeps its entry
+                if video_hash not in _chapter_prefetch:
+                    chapters_future = Future()
+                    _chapter_prefetch[video_hash] = chapters_future
+                    while len(_chapter_prefetch) > CHAPTER_PREFETCH_SIZE:
+                        _, evicted = _chapter_prefetch.popitem(last=False)
+                        if not evicted.done():
+                            evicted.set_result(None)
+
+        job.check()
+        shots = _start_shot_index(job.video_path)   # Decodes alongside the processing wait
+        client = genai.Client(api_key=api_key)
+        _get_active_file(client, job.video_path, job.cancel_event)
+
+        job.check()
+        shots.result()
+
+        if chapters_future is not None:
+            job.check()
+            chapters = _generate_smart_chapters(api_key, job.video_path)
+            failed = not chapters or chapters[0][1].startswith(("Error", "Chapter Generation Failed"))
+            _resolve_chapter_prefetch(chapters_future, None if failed else chapters)
+        print(f"🚀 DEBUG: Prefetch ready for {job.video_path}")
+    except PrefetchCancelled:
+        print(f"🛑 DEBUG: Prefetch cancelled for {job.video_path}")
+    except Exception as e:
+        print(f"⚠️ DEBUG: Prefetch failed: {e}")
+    finally:
+        if chapters_future is not None:
+            _resolve_chapter_prefetch(chapters_future, None)
+            if chapters_future.result() is None:
+                # Cancelled or failed: nothing worth claiming, don't keep the slot
+                with _cache_lock:
+                    if _chapter_prefetch.get(video_hash) is chapters_future:
+                        del _chapter_prefetch[video_hash]
+
 # --- SAFETY CONFIGURATOR ---
 def _configure_safety(user_filters):
     """
@@ -77,11 +613,9 @@ def generate_subtitles_backend(api_key, video_path, target_language="English", i
     """
     client = genai.Client(api_key=api_key)
     
-    # 1. Upload Video (Protected)
-    print(f"☁️ DEBUG: Starting Upload for {video_path}...") # ADDED: Debug print
+    # 1. Upload Video (Protected, reused if already uploaded/prefetched)
     try:
-        myfile = client.files.upload(file=video_path)
-        myfile = _wait_for_processing(client, myfile)
+        myfile = _get_active_file(client, video_path)
     except Exception as e:
         print(f"❌ DEBUG: Upload Failed: {e}") # ADDED: Debug print
         return f"Error Uploading: {e}"
@@ -181,21 +715,54 @@ def generate_subtitles_backend(api_key, video_path, target_language="English", i
 def generate_smart_chapters(api_key, video_path):
     """
     Standard Chapter Generation.
+    Picks up a prefetched result (waiting for it if still running) before calling the model.
     """
+    try:
+        video_hash = video_fingerprint(video_path)
+    except OSError:
+        video_hash = None
+    with _cache_lock:
+        pending = _chapter_prefetch.pop(video_hash, None)
+    if pending is not None:
+        chapters = pending.result()
+        if chapters:
+            print("⚡ DEBUG: Using prefetched chapters.")
+            return chapters
+    return _generate_smart_chapters(api_key, video_path)
+
+
+def _generate_smart_chapters(api_key, video_path):
+    """
+    Uncached model call behind generate_smart_chapters.
+    """
+    # Local decode runs on the shot pool while we upload / wait for ACTIVE
+    shots = _start_shot_index(video_path)
     client = genai.Client(api_key=api_key)
     try:
-        myfile = client.files.upload(file=video_path)
-        myfile = _wait_for_processing(client, myfile)
+        myfile = _get_active_file(client, video_path)
     except Exception as e:
         return [("00:00", f"Error: {e}")]
 
     prompt = "Analyze video. Generate Smart Chapters. Format STRICTLY: 'MM:SS - Chapter Title'. Start with 00:00."
+    config = {"temperature": 0.1}
+
+    # Seed the model with locally detected cuts: boundaries are already known,
+    # so low media resolution is enough to name the scenes.
+    cuts = shots.result()
+    if cuts:
+        strongest = sorted(cuts, key=lambda c: c[1], reverse=True)[:SHOT_PROMPT_LIMIT]
+        listing = ", ".join(format_timestamp(t) for t, _ in sorted(strongest))
+        prompt += (
+            f" Detected scene cuts (candidate chapter starts): {listing}."
+            " Prefer these boundaries; pick other times only for narrative shifts without a cut."
+        )
+        config["media_resolution"] = "MEDIA_RESOLUTION_LOW"
 
     try:
         response = client.models.generate_content(
             model=MODEL_ID, 
             contents=[myfile, prompt],
-            config={"temperature": 0.1}
+            config=config
         )
         
         # Apply the same robust extraction here (optional but safe)
@@ -215,20 +782,109 @@ def generate_smart_chapters(api_key, video_path):
                     parts = line.split(" - ", 1)
                     if len(parts) == 2:
                         chapters.append((parts[0].strip(), parts[1].strip()))
-        return chapters
+        return _snap_chapters(chapters, cuts)
 
     except Exception as e:
         return [("00:00", "Chapter Generation Failed")]
 
 
+def _snap_chapters(chapters, cuts):
+    """
+    Snaps chapter starts onto real cuts. Keeps the model's timestamp if it is
+    unreadable, or if snapping would collide with another chapter or jump past
+    a neighbour (order and uniqueness are preserved).
+    """
+    starts = [parse_timestamp(ts) for ts, _ in chapters]
+    taken = {sec for sec in starts if sec is not None}
+    snapped, prev = [], None
+    for i, (ts, title) in enumerate(chapters):
+        sec = starts[i]
+        if sec is not None:
+            new_sec = snap_to_shot(sec, cuts)
+            nxt = next((s for s in starts[i + 1:] if s is not None), None)
+            if (new_sec != sec and new_sec not in taken
+                    and (prev is None or prev < new_sec)
+                    and (nxt is None or new_sec < nxt)):
+                taken.discard(sec)
+                taken.add(new_sec)
+                ts, sec = format_timestamp(new_sec), new_sec
+            starts[i] = prev = sec
+        snapped.append((ts, title))
+    return snapped
+
+
+# --- ASSISTANT RESPONSE CACHE ---
+def _assistant_cache_key(video_path, current_srt, current_chapters, user_instruction, user_filters):
+    """
+    Identifies a question against one exact state of video + subtitles + chapters.
+    Any PATCH / CHAPTERS edit changes the context digest, so old answers stop matching.
+    """
+    try:
+        video_hash = video_fingerprint(video_path)
+    except OSError:
+        return None
+    # Whitespace only: case and punctuation can matter ("Apple" vs "apple", "to Hello")
+    instruction = " ".join(str(user_instruction).split())
+    safety = tuple(sorted((user_filters or {}).items()))
+
+    context = hashlib.blake2b(digest_size=16)
+    context.update((current_srt or "").encode("utf-8"))
+    for ts, title in current_chapters or []:
+        context.update(f"\0{ts} - {title}".encode("utf-8"))
+    return (video_hash, instruction, safety, context.hexdigest())
+
+def _is_cacheable_response(response):
+    """
+    ANSWER / SEEK / content-scan replies only; edits and errors always go to the model.
+    (Unprefixed replies are shown as answers by the UI, so they count as ANSWER.)
+    """
+    return bool(response) and not response.startswith(_EDIT_PREFIXES + _FAILED_ANSWERS)
+
+def _drop_assistant_cache(video_hash):
+    """
+    Frees entries of a video whose subtitles/chapters were just edited.
+    """
+    with _cache_lock:
+        for key in [k for k in _assistant_cache if k[0] == video_hash]:
+            del _assistant_cache[key]
+
+
 def vx_assistant_fix(api_key, video_path, current_srt, current_chapters, user_instruction, user_filters=None):
     """
     VX Assistant Logic (Multimodal + Context Aware).
+    Repeat questions against an unchanged video state are served from the LRU cache.
+    """
+    cache_key = _assistant_cache_key(video_path, current_srt, current_chapters, user_instruction, user_filters)
+    if cache_key is not None:
+        with _cache_lock:
+            cached = _assistant_cache.get(cache_key)
+            if cached is not None:
+                _assistant_cache.move_to_end(cache_key)
+        if cached is not None:
+            print("⚡ DEBUG: Assistant cache hit.")
+            return cached
+
+    response = _vx_assistant_call(api_key, video_path, current_srt, current_chapters, user_instruction, user_filters)
+
+    if cache_key is not None:
+        if response.startswith(_EDIT_PREFIXES):
+            _drop_assistant_cache(cache_key[0])
+        elif _is_cacheable_response(response):
+            with _cache_lock:
+                _assistant_cache[cache_key] = response
+                _assistant_cache.move_to_end(cache_key)
+                while len(_assistant_cache) > ASSISTANT_CACHE_SIZE:
+                    _assistant_cache.popitem(last=False)
+    return response
+
+
+def _vx_assistant_call(api_key, video_path, current_srt, current_chapters, user_instruction, user_filters=None):
+    """
+    Uncached multimodal call behind vx_assistant_fix.
     """
     client = genai.Client(api_key=api_key)
     try:
-        myfile = client.files.upload(file=video_path)
-        myfile = _wait_for_processing(client, myfile)
+        myfile = _get_active_file(client, video_path)
     except Exception as e:
         return f"ANSWER: Error accessing video: {e}"
 